@@ -1,19 +1,78 @@
+import io
 import os
 import sys
 import subprocess
 import threading
 import time
-from datetime import datetime
+import queue
+import hashlib
+import pathlib
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
 from typing import Optional, Tuple, List, Dict
 import tkinter as tk
 from tkinter import ttk, filedialog, messagebox, scrolledtext
 from PIL import Image, ImageTk
 import ffmpeg
-import humanize
+
+
+def _format_size(num_bytes: float) -> str:
+    """Format a byte count as a short human-readable string."""
+    for unit in ('B', 'KB', 'MB', 'GB'):
+        if num_bytes < 1024:
+            return f"{num_bytes:.1f} {unit}"
+        num_bytes /= 1024
+    return f"{num_bytes:.1f} TB"
 
 class VideoCompressorApp:
     """Modern video compressor application with professional UI/UX."""
-    
+
+    DEFAULT_CRF = 23
+
+    PREVIEW_SIZE = (300, 300)
+
+    THUMB_CACHE_MAX_ENTRIES = 200
+
+    RESOLUTION_MAP = {
+        "2160p (4K)": "3840x2160",
+        "1440p (QHD)": "2560x1440",
+        "1080p (Full HD)": "1920x1080",
+        "720p (HD)": "1280x720",
+        "480p (SD)": "854x480",
+        "360p": "640x360",
+        "240p": "426x240"
+    }
+
+    # Base codec settings per output format; CRF/preset and any
+    # hardware-encoder overrides are filled in per encode
+    ENCODER_PROFILES = {
+        'mp4': {'c:v': 'libx264', 'c:a': 'aac', 'b:a': '128k'},
+        'mov': {'c:v': 'libx264', 'c:a': 'aac', 'b:a': '128k'},
+        'mkv': {'c:v': 'libx264', 'c:a': 'aac', 'b:a': '128k'},
+        'webm': {'c:v': 'libvpx-vp9', 'c:a': 'libopus', 'b:a': '128k'},
+        # x264 rather than the MPEG-4 Part 2 encoders: several times
+        # faster and much smaller output at the same quality, and AVI
+        # carries H.264/AAC fine
+        'avi': {'c:v': 'libx264', 'c:a': 'aac', 'b:a': '128k'},
+    }
+
+    # (video, audio) codecs each container accepts with -c copy;
+    # formats not listed (mkv) take practically anything
+    CONTAINER_COPY_CODECS = {
+        'webm': ({'vp8', 'vp9', 'av1'}, {'vorbis', 'opus'}),
+        'mp4': ({'h264', 'hevc', 'av1', 'mpeg4'}, {'aac', 'mp3', 'ac3', 'alac'}),
+        'mov': ({'h264', 'hevc', 'mpeg4', 'prores', 'mjpeg'}, {'aac', 'mp3', 'alac', 'pcm_s16le'}),
+        'avi': ({'h264', 'mpeg4', 'mjpeg'}, {'aac', 'mp3', 'ac3', 'pcm_s16le'}),
+    }
+
+    # Hardware H.264 encoders in preference order, keyed by UI name
+    HW_ENCODER_NAMES = {
+        'NVENC': 'h264_nvenc',
+        'QSV': 'h264_qsv',
+        'VideoToolbox': 'h264_videotoolbox',
+        'AMF': 'h264_amf',
+    }
+
     def __init__(self, root: tk.Tk):
         self.root = root
         self.root.title("VideoCompressor Pro")
@@ -24,15 +83,62 @@ class VideoCompressorApp:
         # App variables
         self.input_file = tk.StringVar()
         self.output_file = tk.StringVar()
-        self.compression_level = tk.IntVar(value=23)  # Default CRF value
+        self.compression_level = tk.IntVar(value=self.DEFAULT_CRF)
         self.output_format = tk.StringVar(value="mp4")
         self.preset = tk.StringVar(value="medium")
         self.bitrate = tk.StringVar(value="0")  # 0 means auto
         self.resolution = tk.StringVar(value="Original")
         self.fps = tk.StringVar(value="Original")
+        self.remux_only = tk.BooleanVar(value=False)
+        self.hw_accel = tk.StringVar(value="Auto")
+        self.parallel_segments = tk.BooleanVar(value=False)
+        self.two_pass = tk.BooleanVar(value=False)
+        self.threads = tk.StringVar(value="Auto")
+        self._hw_encoders = set()
         self.progress = tk.DoubleVar()
         self.status_text = tk.StringVar(value="Ready")
         self.is_processing = False
+
+        # Preview thumbnails keyed by (path, mtime); the PhotoImage
+        # itself is pooled and reused so Tk keeps one backing pixmap
+        self._thumb_cache: Dict[Tuple[str, float], tuple] = {}
+        self._preview_photo = None
+
+        # On-disk thumbnail cache shared across sessions
+        self._thumb_cache_dir = pathlib.Path.home() / '.cache' / 'videocompressor' / 'thumbs'
+        try:
+            self._thumb_cache_dir.mkdir(parents=True, exist_ok=True)
+            self._evict_thumb_cache()
+        except OSError:
+            self._thumb_cache_dir = None
+
+        # Cached probe data for the current input file, keyed by
+        # (path, mtime) and updated under a lock: the preview worker
+        # and the encode thread both probe
+        self._probe_lock = threading.Lock()
+        self._probed_key = None
+        self._input_probe = None
+        self._video_stream = None
+        self._input_duration = 0.0
+
+        # UI updates from worker threads are queued here and applied in
+        # batches on the main loop; Tk widgets are not thread-safe.
+        self._ui_queue = queue.Queue()
+
+        # Progress weighting for multi-stage encodes (two-pass)
+        self._progress_base = 0.0
+        self._progress_scale = 1.0
+
+        # Cancellation flag, plus the live segment subprocesses so
+        # Cancel can reach the parallel path
+        self._cancel_event = threading.Event()
+        self._segment_procs = set()
+        self._segment_lock = threading.Lock()
+
+        # Log timestamp, cached per second; strftime is surprisingly
+        # expensive to run once per high-frequency log line
+        self._log_ts_second = -1
+        self._log_ts = ""
         
         # Configure styles
         self.setup_styles()
@@ -42,6 +148,9 @@ class VideoCompressorApp:
         
         # Initialize FFmpeg check
         self.check_ffmpeg_installed()
+
+        # Start draining queued UI updates
+        self.monitor_progress()
     
     def setup_styles(self):
         """Configure modern UI styles."""
@@ -172,7 +281,51 @@ class VideoCompressorApp:
             state="readonly"
         )
         fps_combo.grid(row=5, column=1, sticky=tk.EW, padx=5)
-        
+
+        # Hardware acceleration
+        ttk.Label(settings_frame, text="Hardware Acceleration:").grid(row=6, column=0, sticky=tk.W, pady=5)
+        hw_combo = ttk.Combobox(
+            settings_frame,
+            textvariable=self.hw_accel,
+            values=["Auto", "None", "NVENC", "QSV", "VideoToolbox", "AMF"],
+            state="readonly"
+        )
+        hw_combo.grid(row=6, column=1, sticky=tk.EW, padx=5)
+
+        # Remux-only fast path
+        remux_check = ttk.Checkbutton(
+            settings_frame,
+            text="Remux only (no re-encode)",
+            variable=self.remux_only
+        )
+        remux_check.grid(row=7, column=1, sticky=tk.W, padx=5, pady=5)
+
+        # Parallel segment encoding
+        parallel_check = ttk.Checkbutton(
+            settings_frame,
+            text="Parallel segments (faster on many cores)",
+            variable=self.parallel_segments
+        )
+        parallel_check.grid(row=8, column=1, sticky=tk.W, padx=5, pady=5)
+
+        # Two-pass encoding for target-bitrate mode
+        two_pass_check = ttk.Checkbutton(
+            settings_frame,
+            text="Two-pass (better quality at target bitrate)",
+            variable=self.two_pass
+        )
+        two_pass_check.grid(row=9, column=1, sticky=tk.W, padx=5, pady=5)
+
+        # Thread tuning
+        ttk.Label(settings_frame, text="Encoder Threads:").grid(row=10, column=0, sticky=tk.W, pady=5)
+        threads_combo = ttk.Combobox(
+            settings_frame,
+            textvariable=self.threads,
+            values=["Auto", "1", "2", "4", "8", "16", "32"],
+            state="readonly"
+        )
+        threads_combo.grid(row=10, column=1, sticky=tk.EW, padx=5)
+
         # Output section
         output_frame = ttk.LabelFrame(main_frame, text="Output", padding=15)
         output_frame.pack(fill=tk.X, pady=(0, 15))
@@ -315,59 +468,186 @@ class VideoCompressorApp:
         
         self.compression_label.config(text=f"{crf} ({quality})")
     
+    def _probe_input(self, input_path: str) -> dict:
+        """Probe the input file once and cache the result.
+
+        Spawning ffprobe is expensive, so the probe data (full result,
+        video stream and duration) is cached and reused by the preview,
+        the encoder setup and the progress parser. The key includes the
+        file's mtime so overwriting a file invalidates the cache.
+        """
+        key = (input_path, os.stat(input_path).st_mtime)
+
+        with self._probe_lock:
+            if key == self._probed_key and self._input_probe is not None:
+                return self._input_probe
+
+        probe = ffmpeg.probe(input_path)
+        video_stream = next((stream for stream in probe['streams'] if stream['codec_type'] == 'video'), None)
+        duration = float(video_stream.get('duration', 0)) if video_stream else 0.0
+
+        with self._probe_lock:
+            self._probed_key = key
+            self._input_probe = probe
+            self._video_stream = video_stream
+            self._input_duration = duration
+
+        return probe
+
     def update_video_preview(self, *args):
-        """Update video preview thumbnail."""
+        """Update the video preview thumbnail without blocking the UI."""
         input_file = self.input_file.get()
-        
-        if not input_file or not os.path.exists(input_file):
-            self.preview_label.config(text="No video selected")
+
+        # One stat covers the existence check and the cache key
+        try:
+            stat = os.stat(input_file) if input_file else None
+        except OSError:
+            stat = None
+
+        if stat is None:
+            self.preview_label.config(text="No video selected", image="")
             return
-        
+
+        cache_key = (input_file, stat.st_mtime)
+        cached = self._thumb_cache.get(cache_key)
+        if cached is not None:
+            image, info_text = cached
+            self._show_preview_image(image, info_text)
+            return
+
+        self.preview_label.config(text="Loading preview...", image="")
+        threading.Thread(
+            target=self._build_preview,
+            args=(input_file, cache_key),
+            daemon=True
+        ).start()
+
+    def _build_preview(self, input_file: str, cache_key: Tuple[str, float]):
+        """Extract a preview frame in a worker thread."""
         try:
-            # Extract first frame for preview
-            probe = ffmpeg.probe(input_file)
-            video_stream = next((stream for stream in probe['streams'] if stream['codec_type'] == 'video'), None)
-            
+            self._probe_input(input_file)
+            video_stream = self._video_stream
+
             if not video_stream:
-                self.preview_label.config(text="No video stream found")
+                self.root.after(0, lambda: self.preview_label.config(text="No video stream found"))
                 return
-            
+
             # Get video dimensions
             width = int(video_stream['width'])
             height = int(video_stream['height'])
-            
-            # Generate thumbnail
-            out, err = (
-                ffmpeg
-                .input(input_file, ss='00:00:01')
-                .filter('scale', width, -1)
-                .output('pipe:', vframes=1, format='image2', vcodec='mjpeg')
-                .run(capture_stdout=True, capture_stderr=True)
-            )
-            
-            # Create and display thumbnail
-            image = Image.open(io.BytesIO(out))
-            image.thumbnail((300, 300))
-            photo = ImageTk.PhotoImage(image)
-            
-            self.preview_label.config(image=photo, text="")
-            self.preview_label.image = photo
-            
-            # Update video info
-            duration = float(video_stream.get('duration', 0))
-            size = os.path.getsize(input_file)
-            
+
+            stat = os.stat(input_file)
+            cache_file = self._thumb_cache_path(input_file, stat)
+            image = None
+            if cache_file is not None and cache_file.exists():
+                # Reuse the thumbnail from a previous session; touch it
+                # so LRU eviction sees it as fresh. A truncated or
+                # corrupt entry (e.g. a crash mid-write) is dropped and
+                # regenerated instead of failing the preview.
+                try:
+                    image = Image.open(io.BytesIO(cache_file.read_bytes()))
+                    image.load()
+                    os.utime(cache_file)
+                except OSError:
+                    image = None
+                    try:
+                        cache_file.unlink()
+                    except OSError:
+                        pass
+
+            if image is None:
+                # Generate the thumbnail at display size: input-side
+                # seek skips decoding up to the seek point, and scaling
+                # inside ffmpeg avoids decoding a full-resolution frame
+                # just to shrink it to 300px in PIL
+                out, err = (
+                    ffmpeg
+                    .input(input_file, ss='00:00:01', hwaccel='auto')
+                    .filter('scale', 300, -2)
+                    .output('pipe:', vframes=1, format='image2', vcodec='mjpeg')
+                    .run(capture_stdout=True, capture_stderr=True)
+                )
+                if cache_file is not None:
+                    try:
+                        cache_file.write_bytes(out)
+                    except OSError:
+                        pass
+                image = Image.open(io.BytesIO(out))
+                image.load()
+
+            duration = self._input_duration
+            size = stat.st_size
+
             info_text = (
                 f"Dimensions: {width}x{height}\n"
                 f"Duration: {time.strftime('%H:%M:%S', time.gmtime(duration))}\n"
-                f"Size: {humanize.naturalsize(size)}"
+                f"Size: {_format_size(size)}"
             )
-            
-            self.preview_label.config(text=info_text, compound=tk.TOP)
-            
+
+            self.root.after(0, self._apply_preview, input_file, cache_key, image, info_text)
+
         except Exception as e:
             self.log(f"Error generating preview: {str(e)}")
-            self.preview_label.config(text="Preview unavailable")
+            self.root.after(0, lambda: self.preview_label.config(text="Preview unavailable"))
+
+    def _apply_preview(self, input_file: str, cache_key: Tuple[str, float],
+                       image: Image.Image, info_text: str):
+        """Display a decoded preview frame; runs on the main thread."""
+        self._thumb_cache[cache_key] = (image, info_text)
+
+        # The selection may have changed while the frame was rendering
+        if self.input_file.get() != input_file:
+            return
+
+        self._show_preview_image(image, info_text)
+
+    def _evict_thumb_cache(self):
+        """Drop the least recently used on-disk thumbnails over the cap."""
+        entries = sorted(
+            self._thumb_cache_dir.glob('*.jpg'),
+            key=lambda path: path.stat().st_mtime,
+            reverse=True
+        )
+        for stale in entries[self.THUMB_CACHE_MAX_ENTRIES:]:
+            try:
+                stale.unlink()
+            except OSError:
+                pass
+
+    def _thumb_cache_path(self, input_file: str,
+                          stat: os.stat_result) -> Optional[pathlib.Path]:
+        """Return the on-disk cache file for a video, or None."""
+        if self._thumb_cache_dir is None:
+            return None
+        key = hashlib.sha1(
+            f"{input_file}|{stat.st_mtime}|{stat.st_size}".encode()
+        ).hexdigest()
+        return self._thumb_cache_dir / f"{key}.jpg"
+
+    def _show_preview_image(self, image: Image.Image, info_text: str):
+        """Blit a PIL image into the pooled preview PhotoImage."""
+        if image.width > self.PREVIEW_SIZE[0] or image.height > self.PREVIEW_SIZE[1]:
+            # BILINEAR is plenty for a 300px thumbnail and several
+            # times faster than the default LANCZOS
+            image = image.copy()
+            image.thumbnail(self.PREVIEW_SIZE, Image.Resampling.BILINEAR)
+
+        # Center the frame on a fixed-size canvas so the pooled
+        # PhotoImage never has to change dimensions
+        canvas = Image.new('RGB', self.PREVIEW_SIZE, '#ffffff')
+        canvas.paste(image, ((self.PREVIEW_SIZE[0] - image.width) // 2,
+                             (self.PREVIEW_SIZE[1] - image.height) // 2))
+
+        if self._preview_photo is None:
+            self._preview_photo = ImageTk.PhotoImage(canvas)
+        else:
+            self._preview_photo.paste(canvas)
+
+        self.preview_label.config(
+            image=self._preview_photo,
+            text=info_text,
+            compound=tk.TOP
+        )
     
     def start_compression(self):
         """Start video compression process in a separate thread."""
@@ -386,16 +666,126 @@ class VideoCompressorApp:
         self.compress_btn.config(state=tk.DISABLED)
         self.cancel_btn.config(state=tk.NORMAL)
         self.progress.set(0)
+        self._progress_base = 0.0
+        self._progress_scale = 1.0
+        self._cancel_event.clear()
         self.status_text.set("Compressing...")
         self.log_text.delete(1.0, tk.END)
         
         # Start compression in a separate thread
         compression_thread = threading.Thread(target=self.compress_video, daemon=True)
         compression_thread.start()
-        
-        # Start progress monitoring
-        self.monitor_progress()
     
+    def _detect_hw_encoders(self):
+        """Start background detection of working hardware encoders.
+
+        The test encodes can block for seconds on a wedged driver, so
+        they must not hold up startup; _select_video_encoder falls
+        back to libx264 until the set is populated.
+        """
+        threading.Thread(target=self._verify_hw_encoders, daemon=True).start()
+
+    def _verify_hw_encoders(self):
+        """Detect which hardware encoders actually work on this machine."""
+        try:
+            result = subprocess.run(
+                ["ffmpeg", "-hide_banner", "-encoders"],
+                capture_output=True,
+                text=True
+            )
+        except OSError:
+            return
+
+        listed = {name for name in self.HW_ENCODER_NAMES.values()
+                  if name in result.stdout}
+
+        # -encoders only says what the build was compiled with; full
+        # builds list NVENC/QSV/AMF on machines without the hardware
+        # and the encoder then fails at init. Prove each one with a
+        # one-frame null encode before trusting it.
+        available = {name for name in listed if self._test_encoder(name)}
+        self._hw_encoders = available
+
+        if available:
+            self.log(f"Hardware encoders available: {', '.join(sorted(available))}")
+
+    def _test_encoder(self, encoder: str) -> bool:
+        """Check that an encoder can initialize by encoding one frame."""
+        try:
+            test = subprocess.run(
+                [
+                    'ffmpeg', '-hide_banner', '-loglevel', 'error',
+                    '-f', 'lavfi', '-i', 'color=black:size=64x64:rate=1',
+                    '-frames:v', '1', '-c:v', encoder, '-f', 'null', '-'
+                ],
+                capture_output=True,
+                timeout=10
+            )
+        except (OSError, subprocess.TimeoutExpired):
+            return False
+        return test.returncode == 0
+
+    def _select_video_encoder(self) -> str:
+        """Pick the best available H.264 encoder for the current settings."""
+        choice = self.hw_accel.get()
+        if choice == "None":
+            return 'libx264'
+        if choice == "Auto":
+            for encoder in self.HW_ENCODER_NAMES.values():
+                if encoder in self._hw_encoders:
+                    return encoder
+            return 'libx264'
+        encoder = self.HW_ENCODER_NAMES.get(choice, 'libx264')
+        return encoder if encoder in self._hw_encoders else 'libx264'
+
+    def _build_video_filters(self) -> List[str]:
+        """Build the filter list for the current resolution/fps settings."""
+        video_filters = []
+
+        # Resolution scaling
+        if self.resolution.get() != "Original":
+            video_filters.append(f"scale={self.RESOLUTION_MAP[self.resolution.get()]}")
+
+        # FPS change
+        if self.fps.get() != "Original":
+            video_filters.append(f"fps={self.fps.get()}")
+
+        return video_filters
+
+    def _thread_count(self) -> int:
+        """Resolve the encoder-thread setting to a concrete count."""
+        choice = self.threads.get()
+        if choice == "Auto":
+            return os.cpu_count() or 1
+        return int(choice)
+
+    def _can_stream_copy(self) -> bool:
+        """Return True if the source codecs are legal in the target container."""
+        allowed = self.CONTAINER_COPY_CODECS.get(self.output_format.get())
+        if allowed is None:
+            return True
+
+        if (self._video_stream or {}).get('codec_name') not in allowed[0]:
+            return False
+
+        streams = (self._input_probe or {}).get('streams', [])
+        audio_stream = next((stream for stream in streams if stream['codec_type'] == 'audio'), None)
+        return audio_stream is None or audio_stream.get('codec_name') in allowed[1]
+
+    def _is_remux_only(self) -> bool:
+        """Return True when no setting requires re-encoding the video."""
+        if self.remux_only.get():
+            # Explicit user override: force the copy even if the muxer
+            # may reject the source codecs
+            return True
+        return (
+            self.resolution.get() == "Original"
+            and self.fps.get() == "Original"
+            and self.bitrate.get() == "0"
+            and int(self.compression_level.get()) == self.DEFAULT_CRF
+            and self._can_stream_copy()
+        )
+
     def compress_video(self):
         """Compress video using FFmpeg with selected settings."""
         input_path = self.input_file.get()
@@ -403,182 +793,475 @@ class VideoCompressorApp:
         
         try:
             # Get input file info
-            probe = ffmpeg.probe(input_path)
-            video_stream = next((stream for stream in probe['streams'] if stream['codec_type'] == 'video'), None)
-            
+            self._probe_input(input_path)
+            video_stream = self._video_stream
+
             if not video_stream:
                 self.log("Error: No video stream found in input file")
                 return
                 
             # Prepare FFmpeg command
-            input_video = ffmpeg.input(input_path)
-            
-            # Video filters
-            video_filters = []
-            
-            # Resolution scaling
-            if self.resolution.get() != "Original":
-                resolution_map = {
-                    "2160p (4K)": "3840x2160",
-                    "1440p (QHD)": "2560x1440",
-                    "1080p (Full HD)": "1920x1080",
-                    "720p (HD)": "1280x720",
-                    "480p (SD)": "854x480",
-                    "360p": "640x360",
-                    "240p": "426x240"
+            input_kwargs = {}
+            if (not self._is_remux_only()
+                    and self.output_format.get() != 'webm'
+                    and self._select_video_encoder() != 'libx264'):
+                # Let ffmpeg pick a matching hardware decoder as well
+                input_kwargs['hwaccel'] = 'auto'
+            input_video = ffmpeg.input(input_path, **input_kwargs)
+            video = input_video.video
+
+            if self._is_remux_only():
+                # Nothing changes the decoded picture, so copy the
+                # streams instead of re-encoding: the job becomes an
+                # I/O-bound, lossless remux.
+                self.log("Remux only: copying streams without re-encoding")
+                output_args = {
+                    'c:v': 'copy',
+                    'c:a': 'copy',
+                    'movflags': '+faststart',
+                    'progress': 'pipe:1',
+                    'nostats': None,
+                    'hide_banner': None,
+                    'loglevel': 'info'
                 }
-                video_filters.append(f"scale={resolution_map[self.resolution.get()]}")
-            
-            # FPS change
-            if self.fps.get() != "Original":
-                video_filters.append(f"fps={self.fps.get()}")
-            
-            # Apply video filters if any
-            if video_filters:
-                video = input_video.video.filter(*video_filters)
             else:
-                video = input_video.video
-            
-            # Output settings
-            output_args = {
-                'c:v': 'libx264',
-                'crf': str(self.compression_level.get()),
-                'preset': self.preset.get(),
-                'movflags': '+faststart',
-                'progress': '-',
-                'nostats': None,
-                'hide_banner': None,
-                'loglevel': 'info'
-            }
-            
-            # Bitrate control
-            if self.bitrate.get() != "0":
-                output_args['b:v'] = f"{self.bitrate.get()}k"
-                output_args['maxrate'] = f"{int(self.bitrate.get()) * 1.5}k"
-                output_args['bufsize'] = f"{int(self.bitrate.get()) * 2}k"
-            
-            # Audio settings
-            output_args['c:a'] = 'aac'
-            output_args['b:a'] = '128k'
-            
-            # Output format
-            if self.output_format.get() == 'webm':
-                output_args['c:v'] = 'libvpx-vp9'
-                output_args['c:a'] = 'libopus'
-            elif self.output_format.get() == 'avi':
-                output_args['c:v'] = 'libxvid'
-                output_args['c:a'] = 'libmp3lame'
-            
-            # Run FFmpeg
-            process = (
-                ffmpeg
-                .output(video, input_video.audio, output_path, **output_args)
-                .overwrite_output()
-                .run_async(pipe_stderr=True)
-            )
-            
-            self.ffmpeg_process = process
-            
-            # Read stderr for progress
-            while True:
-                line = process.stderr.readline().decode('utf-8')
-                if not line:
-                    break
-                self.parse_ffmpeg_output(line)
-                
-            process.wait()
-            
-            if process.returncode == 0:
+                # Apply video filters if any
+                video_filters = self._build_video_filters()
+                if video_filters:
+                    video = video.filter(*video_filters)
+
+                # Output settings from the per-format profile
+                output_format = self.output_format.get()
+                output_args = dict(self.ENCODER_PROFILES.get(
+                    output_format, self.ENCODER_PROFILES['mp4']))
+                if output_format == 'avi':
+                    self.log("Note: writing H.264 into AVI; MP4 is the better-supported container")
+                output_args.update({
+                    'crf': str(self.compression_level.get()),
+                    'preset': self.preset.get(),
+                    'movflags': '+faststart',
+                    'progress': 'pipe:1',
+                    'nostats': None,
+                    'hide_banner': None,
+                    'loglevel': 'info'
+                })
+
+                # Bitrate control
+                if self.bitrate.get() != "0":
+                    output_args['b:v'] = f"{self.bitrate.get()}k"
+                    output_args['maxrate'] = f"{int(self.bitrate.get()) * 1.5}k"
+                    output_args['bufsize'] = f"{int(self.bitrate.get()) * 2}k"
+
+                # Hardware encoder (H.264 outputs only; webm keeps
+                # its format-specific codecs)
+                if output_args['c:v'] == 'libx264':
+                    encoder = self._select_video_encoder()
+                    if encoder != 'libx264':
+                        self.log(f"Using hardware encoder: {encoder}")
+                        output_args['c:v'] = encoder
+                        # Hardware encoders don't take -crf; map the
+                        # quality level to their own rate-control knob
+                        quality = output_args.pop('crf')
+                        if encoder == 'h264_nvenc':
+                            output_args['cq'] = quality
+                        elif encoder == 'h264_qsv':
+                            output_args['global_quality'] = quality
+                        elif encoder == 'h264_amf':
+                            output_args['qp_i'] = quality
+                            output_args['qp_p'] = quality
+                            output_args.pop('preset', None)
+                        elif encoder == 'h264_videotoolbox':
+                            # -q:v is a 1-100 quality percentage where
+                            # higher is better, the inverse of CRF
+                            output_args['q:v'] = str(max(100 - int(quality) * 2, 1))
+                            output_args.pop('preset', None)
+
+                # Thread tuning
+                thread_count = self._thread_count()
+                output_args['threads'] = str(thread_count)
+                if (output_args['c:v'] == 'libx264'
+                        and self.preset.get() in ('ultrafast', 'superfast', 'veryfast')):
+                    # Sliced threads cut per-frame latency on the fast
+                    # presets, where frame-parallel lookahead is shallow
+                    output_args['x264-params'] = f'sliced-threads=1:threads={thread_count}'
+
+            if self.parallel_segments.get() and not self._is_remux_only():
+                returncode = self._compress_segmented(input_path, output_path, output_args)
+            elif (self.two_pass.get() and self.bitrate.get() != "0"
+                    and not self._is_remux_only()):
+                returncode = self._compress_two_pass(video, input_video, output_path, output_args)
+            else:
+                cmd = (
+                    ffmpeg
+                    .output(video, input_video.audio, output_path, **output_args)
+                    .overwrite_output()
+                    .compile()
+                )
+                returncode = self._run_ffmpeg(cmd)
+
+            if returncode == 0:
                 self.log("\nCompression completed successfully!")
-                self.status_text.set("Compression completed")
-                
+                self._ui_queue.put(('status', "Compression completed"))
+
                 # Show compression results
-                original_size = os.path.getsize(input_path)
-                compressed_size = os.path.getsize(output_path)
+                original_size = os.stat(input_path).st_size
+                compressed_size = os.stat(output_path).st_size
                 reduction = (original_size - compressed_size) / original_size * 100
-                
-                self.log(f"\nOriginal size: {humanize.naturalsize(original_size)}")
-                self.log(f"Compressed size: {humanize.naturalsize(compressed_size)}")
+
+                self.log(f"\nOriginal size: {_format_size(original_size)}")
+                self.log(f"Compressed size: {_format_size(compressed_size)}")
                 self.log(f"Reduction: {reduction:.2f}%")
-                
-                messagebox.showinfo(
+
+                self.root.after(0, lambda: messagebox.showinfo(
                     "Success",
                     f"Video compressed successfully!\n\n"
                     f"Size reduced by {reduction:.2f}%\n"
                     f"Saved to: {output_path}"
-                )
+                ))
+            elif self._cancel_event.is_set():
+                self.log("\nCompression cancelled")
+                self._ui_queue.put(('status', "Cancelled"))
             else:
                 self.log("\nCompression failed!")
-                self.status_text.set("Compression failed")
-                messagebox.showerror("Error", "Video compression failed")
-                
+                self._ui_queue.put(('status', "Compression failed"))
+                self.root.after(0, lambda: messagebox.showerror("Error", "Video compression failed"))
+
         except Exception as e:
-            self.log(f"\nError during compression: {str(e)}")
-            self.status_text.set("Error occurred")
-            messagebox.showerror("Error", f"An error occurred: {str(e)}")
-            
+            error_text = str(e)
+            self.log(f"\nError during compression: {error_text}")
+            self._ui_queue.put(('status', "Error occurred"))
+            self.root.after(0, lambda: messagebox.showerror("Error", f"An error occurred: {error_text}"))
+
         finally:
             self.is_processing = False
-            self.compress_btn.config(state=tk.NORMAL)
-            self.cancel_btn.config(state=tk.DISABLED)
             self.ffmpeg_process = None
+            self.root.after(0, self._reset_buttons)
+
+    def _reset_buttons(self):
+        """Restore button states after compression ends."""
+        self.compress_btn.config(state=tk.NORMAL)
+        self.cancel_btn.config(state=tk.DISABLED)
     
+    def _run_ffmpeg(self, cmd: List[str]) -> int:
+        """Run an ffmpeg command, streaming progress and stderr logs.
+
+        The process is spawned directly instead of via run_async() so
+        the pipes get a large buffer; the default tiny pipe buffer
+        causes a read syscall per progress line during long encodes.
+        """
+        process = subprocess.Popen(
+            cmd,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            bufsize=1 << 20
+        )
+
+        self.ffmpeg_process = process
+
+        # Mirror ffmpeg's stderr into the log from a separate thread
+        # so neither pipe can fill up and stall the encoder.
+        stderr_thread = threading.Thread(
+            target=self._drain_stderr,
+            args=(process.stderr,),
+            daemon=True
+        )
+        stderr_thread.start()
+
+        # Read the machine-readable -progress stream from stdout
+        progress_stream = io.TextIOWrapper(
+            process.stdout,
+            encoding='utf-8',
+            errors='replace',
+            newline='\n'
+        )
+        for line in progress_stream:
+            self.parse_ffmpeg_output(line)
+
+        stderr_thread.join()
+        return process.wait()
+
+    def _compress_two_pass(self, video, input_video, output_path: str,
+                           output_args: dict) -> int:
+        """Run a two-pass target-bitrate encode.
+
+        Pass 1 analyzes the video into a stats file with audio disabled
+        and a null muxer; pass 2 does the real encode using those
+        stats. Progress is weighted 1/3 : 2/3 since the analysis pass
+        skips entropy coding and runs roughly twice as fast.
+        """
+        # The hardware encoders neither write nor read two-pass stats,
+        # so a first pass with them is wasted work and their constant-
+        # quality knobs fight the bitrate target; two-pass always runs
+        # libx264
+        if output_args.get('c:v') in self.HW_ENCODER_NAMES.values():
+            self.log("Two-pass requires software encoding; using libx264")
+            output_args = dict(output_args)
+            output_args['c:v'] = 'libx264'
+            for key in ('cq', 'global_quality', 'qp_i', 'qp_p', 'q:v'):
+                output_args.pop(key, None)
+            output_args.setdefault('preset', self.preset.get())
+
+        with tempfile.TemporaryDirectory(prefix='videocompressor_') as tmp_dir:
+            passlog = os.path.join(tmp_dir, 'ffmpeg2pass')
+
+            # x264 rejects CRF combined with pass stats; the passes
+            # run ABR against the target bitrate, which is the point
+            first_args = dict(output_args)
+            for key in ('crf', 'c:a', 'b:a', 'movflags'):
+                first_args.pop(key, None)
+            first_args.update({
+                'pass': 1,
+                'passlogfile': passlog,
+                'an': None,
+                'f': 'null'
+            })
+
+            self.log("Two-pass encode: running analysis pass")
+            self._progress_base = 0.0
+            self._progress_scale = 1 / 3
+            cmd = (
+                ffmpeg
+                .output(video, os.devnull, **first_args)
+                .overwrite_output()
+                .compile()
+            )
+            returncode = self._run_ffmpeg(cmd)
+            if returncode != 0:
+                return returncode
+
+            second_args = dict(output_args)
+            second_args.pop('crf', None)
+            second_args.update({'pass': 2, 'passlogfile': passlog})
+
+            self.log("Two-pass encode: running final pass")
+            self._progress_base = 100 / 3
+            self._progress_scale = 2 / 3
+            cmd = (
+                ffmpeg
+                .output(video, input_video.audio, output_path, **second_args)
+                .overwrite_output()
+                .compile()
+            )
+            return self._run_ffmpeg(cmd)
+
+    def _compress_segmented(self, input_path: str, output_path: str,
+                            output_args: dict) -> int:
+        """Encode the input as parallel segments and concat the results.
+
+        The input is split losslessly with the segment muxer, each
+        segment is encoded by its own ffmpeg process (workers are
+        threads, since they only supervise subprocesses), and the
+        encoded segments are joined with the concat demuxer. Trades a
+        tiny GOP-boundary quality loss for near-linear scaling with
+        core count on long videos.
+        """
+        video_filters = self._build_video_filters()
+
+        with tempfile.TemporaryDirectory(prefix='videocompressor_') as tmp_dir:
+            # Split the input into ~60s segments without re-encoding
+            seg_pattern = os.path.join(tmp_dir, 'seg_%03d.mkv')
+            split = subprocess.run(
+                [
+                    'ffmpeg', '-hide_banner', '-loglevel', 'error', '-y',
+                    '-i', input_path,
+                    '-c', 'copy', '-f', 'segment',
+                    '-segment_time', '60',
+                    '-reset_timestamps', '1',
+                    seg_pattern
+                ],
+                capture_output=True,
+                text=True
+            )
+            if split.returncode != 0:
+                self.log(split.stderr)
+                return split.returncode
+
+            segments = sorted(
+                os.path.join(tmp_dir, name)
+                for name in os.listdir(tmp_dir)
+                if name.startswith('seg_')
+            )
+            workers = min(len(segments), os.cpu_count() or 1)
+            self.log(f"Encoding {len(segments)} segments on {workers} workers")
+
+            # Progress comes from completed segments, not a live pipe,
+            # and the mkv intermediates don't take mov muxer flags
+            encode_args = dict(output_args)
+            for key in ('progress', 'nostats', 'movflags'):
+                encode_args.pop(key, None)
+
+            # Parallelism comes from the workers here; inheriting the
+            # cpu_count() thread tuning would put workers x threads
+            # encoder threads on the box. Split the cores across
+            # workers instead.
+            encode_args.pop('x264-params', None)
+            encode_args['threads'] = str(max(1, (os.cpu_count() or 1) // workers))
+
+            done_count = [0]
+            done_lock = threading.Lock()
+
+            def encode_segment(segment_path: str) -> str:
+                if self._cancel_event.is_set():
+                    raise RuntimeError("cancelled")
+                out_segment = segment_path.replace('seg_', 'enc_')
+                seg_input = ffmpeg.input(segment_path)
+                seg_video = seg_input.video
+                if video_filters:
+                    seg_video = seg_video.filter(*video_filters)
+                cmd = (
+                    ffmpeg
+                    .output(seg_video, seg_input.audio, out_segment, **encode_args)
+                    .overwrite_output()
+                    .compile()
+                )
+                # Register the process so cancel_compression can
+                # terminate in-flight segments
+                process = subprocess.Popen(
+                    cmd,
+                    stdout=subprocess.PIPE,
+                    stderr=subprocess.PIPE,
+                    text=True
+                )
+                with self._segment_lock:
+                    self._segment_procs.add(process)
+                try:
+                    _, stderr_out = process.communicate()
+                finally:
+                    with self._segment_lock:
+                        self._segment_procs.discard(process)
+                if self._cancel_event.is_set():
+                    raise RuntimeError("cancelled")
+                if process.returncode != 0:
+                    raise RuntimeError(stderr_out)
+                with done_lock:
+                    done_count[0] += 1
+                    self._ui_queue.put(('progress', done_count[0] / len(segments) * 100))
+                return out_segment
+
+            with ThreadPoolExecutor(max_workers=workers) as pool:
+                try:
+                    encoded = list(pool.map(encode_segment, segments))
+                except RuntimeError as e:
+                    self.log(f"Segment encode failed: {e}")
+                    return 1
+
+            # Join the encoded segments into the final container
+            list_path = os.path.join(tmp_dir, 'segments.txt')
+            with open(list_path, 'w') as list_file:
+                for segment in encoded:
+                    list_file.write(f"file '{segment}'\n")
+
+            concat = subprocess.run(
+                [
+                    'ffmpeg', '-hide_banner', '-loglevel', 'error', '-y',
+                    '-f', 'concat', '-safe', '0', '-i', list_path,
+                    '-c', 'copy', '-movflags', '+faststart',
+                    output_path
+                ],
+                capture_output=True,
+                text=True
+            )
+            if concat.returncode != 0:
+                self.log(concat.stderr)
+            return concat.returncode
+
     def parse_ffmpeg_output(self, line: str):
-        """Parse FFmpeg output for progress information."""
-        if "frame=" in line and "time=" in line and "bitrate=" in line:
-            # Extract time
-            time_str = line.split("time=")[1].split()[0]
-            hours, minutes, seconds = map(float, time_str.split(':'))
-            total_seconds = hours * 3600 + minutes * 60 + seconds
-            
-            # Get duration from input file
-            input_path = self.input_file.get()
-            probe = ffmpeg.probe(input_path)
-            video_stream = next((stream for stream in probe['streams'] if stream['codec_type'] == 'video'), None)
-            
-            if video_stream:
-                duration = float(video_stream.get('duration', 0))
-                if duration > 0:
-                    progress = (total_seconds / duration) * 100
-                    self.progress.set(min(progress, 100))
-            
-            self.log_text.insert(tk.END, line)
-            self.log_text.see(tk.END)
-            self.log_text.update()
+        """Parse a key=value line from FFmpeg's -progress stream.
+
+        The progress block emits a dozen keys per tick; everything but
+        the two keys used here exits on a single prefix check.
+        """
+        if line.startswith('out_time_us='):
+            try:
+                out_time_us = int(line[len('out_time_us='):])
+            except ValueError:
+                return
+            if self._input_duration > 0:
+                progress = out_time_us / (self._input_duration * 1e6) * 100
+                progress = self._progress_base + min(progress, 100) * self._progress_scale
+                self._ui_queue.put(('progress', progress))
+        elif line.startswith('progress=') and line[len('progress='):].strip() == 'end':
+            self._ui_queue.put(('progress', self._progress_base + 100 * self._progress_scale))
+
+    def _drain_stderr(self, pipe):
+        """Mirror FFmpeg's stderr output into the log console."""
+        stderr = io.TextIOWrapper(
+            pipe,
+            encoding='utf-8',
+            errors='replace',
+            newline='\n'
+        )
+        for line in stderr:
+            self._ui_queue.put(('log', line))
     
     def monitor_progress(self):
-        """Monitor compression progress."""
-        if self.is_processing:
-            # Here we could add additional progress monitoring logic
-            self.root.after(500, self.monitor_progress)
+        """Apply queued UI updates from worker threads on the main loop."""
+        pending_log = []
+        progress_value = None
+        status = None
+
+        # Cap the batch so a stderr flood can't monopolize a tick
+        for _ in range(200):
+            try:
+                kind, payload = self._ui_queue.get_nowait()
+            except queue.Empty:
+                break
+            if kind == 'log':
+                pending_log.append(payload)
+            elif kind == 'progress':
+                progress_value = payload
+            elif kind == 'status':
+                status = payload
+
+        if pending_log:
+            # One insert and one scroll per tick regardless of volume
+            self.log_text.insert(tk.END, ''.join(pending_log))
+            self.log_text.see(tk.END)
+        if progress_value is not None:
+            self.progress.set(progress_value)
+        if status is not None:
+            self.status_text.set(status)
+
+        self.root.after(50, self.monitor_progress)
     
     def cancel_compression(self):
         """Cancel the ongoing compression process."""
-        if hasattr(self, 'ffmpeg_process') and self.ffmpeg_process:
+        if not self.is_processing:
+            return
+
+        self._cancel_event.set()
+
+        # Stop the single-process encode, if one is running
+        if getattr(self, 'ffmpeg_process', None):
             self.ffmpeg_process.terminate()
             try:
                 self.ffmpeg_process.wait(timeout=5)
             except subprocess.TimeoutExpired:
                 self.ffmpeg_process.kill()
-                
-            self.is_processing = False
-            self.compress_btn.config(state=tk.NORMAL)
-            self.cancel_btn.config(state=tk.DISABLED)
-            self.status_text.set("Cancelled")
-            self.log("\nCompression cancelled by user")
+
+        # Stop any in-flight segment encodes
+        with self._segment_lock:
+            segment_procs = list(self._segment_procs)
+        for process in segment_procs:
+            process.terminate()
+
+        self.status_text.set("Cancelled")
+        self.log("\nCompression cancelled by user")
     
     def log(self, message: str):
-        """Add message to log console."""
-        timestamp = datetime.now().strftime("%H:%M:%S")
-        self.log_text.insert(tk.END, f"[{timestamp}] {message}\n")
-        self.log_text.see(tk.END)
-        self.log_text.update()
+        """Queue a message for the log console."""
+        now = int(time.time())
+        if now != self._log_ts_second:
+            self._log_ts_second = now
+            self._log_ts = time.strftime("%H:%M:%S")
+        self._ui_queue.put(('log', f"[{self._log_ts}] {message}\n"))
     
     def check_ffmpeg_installed(self):
         """Check if FFmpeg is installed and available."""
         try:
             ffmpeg_path = ffmpeg._utils.get_ffmpeg_version()
             self.log(f"FFmpeg found at: {ffmpeg_path}")
+            self._detect_hw_encoders()
             return True
         except ffmpeg._run.Error:
             self.log("FFmpeg not found. Please install FFmpeg and add it to your PATH.")
@@ -605,5 +1288,4 @@ def main():
     root.mainloop()
 
 if __name__ == "__main__":
-    import io  # Needed for preview generation
     main()